@@ -3,119 +3,146 @@ import pandas as pd
 from datetime import datetime, timedelta
 import random
 
+# Transaction types with realistic probabilities
+_TYPES = np.array(['purchase', 'transfer', 'withdrawal', 'payment'])
+_TYPE_WEIGHTS = np.array([0.4, 0.25, 0.2, 0.15], dtype=np.float64)
+_TYPE_CUM = np.cumsum(_TYPE_WEIGHTS)
+_TYPE_CUM /= _TYPE_CUM[-1]
+
+# Transaction hour distribution (daytime weighted), normalized once at import
+_HOUR_WEIGHTS = np.array([0.02, 0.01, 0.01, 0.01, 0.02, 0.03, 0.05, 0.08,
+                          0.10, 0.09, 0.08, 0.07, 0.06, 0.07, 0.08, 0.09,
+                          0.10, 0.12, 0.15, 0.08, 0.05, 0.03, 0.02, 0.01], dtype=np.float64)
+_HOUR_WEIGHTS /= _HOUR_WEIGHTS.sum()
+_HOUR_CUM = np.cumsum(_HOUR_WEIGHTS)
+_HOUR_CUM /= _HOUR_CUM[-1]
+
+# Fraud patterns; each row of the tables below describes one pattern
+_FRAUD_TYPES = np.array(['high_amount', 'late_night', 'high_risk', 'burst'])
+_HIGH_RISK, _BURST = 2, 3
+
+# Amount distribution per pattern: lognormal (mean, sigma) clipped to [low, high]
+_FRAUD_AMOUNT_MEAN = np.array([8.0, 4.0, 5.0, 3.5])
+_FRAUD_AMOUNT_SIGMA = np.array([1.5, 1.5, 1.5, 1.0])
+_FRAUD_AMOUNT_LOW = np.array([10000, 100, 500, 50], dtype=np.float64)
+_FRAUD_AMOUNT_HIGH = np.array([100000, 10000, 20000, 5000], dtype=np.float64)
+
+# Transaction types per pattern, picked uniformly
+_FRAUD_TRANSACTION_TYPES = np.array([
+    ['transfer', 'purchase'],
+    ['transfer', 'withdrawal'],
+    ['transfer', 'purchase'],
+    ['purchase', 'payment'],
+])
+
+# Allowed hours per pattern, padded to 24 columns; only the first
+# _FRAUD_HOUR_COUNTS[i] entries of row i are drawn from
+_FRAUD_HOURS = np.zeros((4, 24), dtype=np.int64)
+_FRAUD_HOURS[0, :12] = np.arange(9, 21)  # Daytime to avoid suspicion
+_FRAUD_HOURS[1, :8] = [0, 1, 2, 3, 4, 5, 22, 23]  # Late night
+_FRAUD_HOURS[2] = np.arange(24)
+_FRAUD_HOURS[3] = np.arange(24)
+_FRAUD_HOUR_COUNTS = np.array([12, 8, 24, 24])
+
+def _transaction_ids(prefix, n):
+    """Build zero-padded transaction ids (e.g. TXN_000001) for n rows"""
+    return np.char.add(prefix, np.char.zfill(np.arange(1, n + 1).astype(str), 6))
+
 class TransactionDataGenerator:
     def __init__(self, seed=42):
-        np.random.seed(seed)
+        self.rng = np.random.default_rng(seed)
         random.seed(seed)
         
+        # Sample pool, built lazily on the first get_sample_transaction call
+        self._cached_df = None
+        self._normal_idx = None
+        self._fraud_idx = None
+        
     def generate_normal_transactions(self, n_transactions=10000):
         """Generate normal financial transactions with realistic patterns"""
-        transactions = []
+        n = n_transactions
         
-        for i in range(n_transactions):
-            # Generate realistic amount distribution (log-normal)
-            amount = np.random.lognormal(mean=3, sigma=1.5)
-            amount = np.clip(amount, 1, 50000)
-            
-            # Transaction types with realistic probabilities
-            transaction_types = ['purchase', 'transfer', 'withdrawal', 'payment']
-            type_weights = [0.4, 0.25, 0.2, 0.15]
-            transaction_type = np.random.choice(transaction_types, p=type_weights)
-            
-            # Account age (most accounts are established)
-            account_age_days = np.random.gamma(shape=2, scale=365)
-            
-            # Risk scores (mostly low, occasional medium)
-            location_risk_score = np.random.beta(a=2, b=10)
-            device_risk_score = np.random.beta(a=3, b=8)
-            
-            # Transaction hour (daytime weighted)
-            hour_weights = np.array([0.02, 0.01, 0.01, 0.01, 0.02, 0.03, 0.05, 0.08, 
-                           0.10, 0.09, 0.08, 0.07, 0.06, 0.07, 0.08, 0.09,
-                           0.10, 0.12, 0.15, 0.08, 0.05, 0.03, 0.02, 0.01])
-            hour_weights = hour_weights / hour_weights.sum()  # Normalize to sum to 1
-            transaction_hour = np.random.choice(24, p=hour_weights)
-            
-            # Past transactions (normal activity)
-            past_transactions_24h = np.random.poisson(lam=5)
-            
-            transaction = {
-                'transaction_id': f'TXN_{i+1:06d}',
-                'amount': round(amount, 2),
-                'transaction_type': transaction_type,
-                'account_age_days': int(account_age_days),
-                'location_risk_score': round(location_risk_score, 3),
-                'device_risk_score': round(device_risk_score, 3),
-                'transaction_hour': transaction_hour,
-                'past_transactions_24h': past_transactions_24h,
-                'is_anomaly': 0
-            }
-            transactions.append(transaction)
-            
-        return transactions
+        # Generate realistic amount distribution (log-normal)
+        amounts = np.clip(self.rng.lognormal(mean=3, sigma=1.5, size=n), 1, 50000)
+        
+        # Transaction types with realistic probabilities, sampled by inverting
+        # the cumulative weights (same method as choice(p=...), without its
+        # per-call validation and cumsum)
+        types = _TYPES[np.searchsorted(_TYPE_CUM, self.rng.random(n), side='right')]
+        
+        # Account age (most accounts are established)
+        ages = self.rng.gamma(shape=2, scale=365, size=n).astype(np.int32)
+        
+        # Risk scores (mostly low, occasional medium)
+        location_risk = self.rng.beta(a=2, b=10, size=n)
+        device_risk = self.rng.beta(a=3, b=8, size=n)
+        
+        # Transaction hour (daytime weighted)
+        hours = np.searchsorted(_HOUR_CUM, self.rng.random(n), side='right')
+        
+        # Past transactions (normal activity)
+        past = self.rng.poisson(lam=5, size=n)
+        
+        # Round whole columns in place
+        np.round(amounts, 2, out=amounts)
+        np.round(location_risk, 3, out=location_risk)
+        np.round(device_risk, 3, out=device_risk)
+        
+        return {
+            'transaction_id': _transaction_ids('TXN_', n),
+            'amount': amounts,
+            'transaction_type': types,
+            'account_age_days': ages,
+            'location_risk_score': location_risk,
+            'device_risk_score': device_risk,
+            'transaction_hour': hours,
+            'past_transactions_24h': past,
+            'is_anomaly': np.zeros(n, dtype=np.int64)
+        }
     
     def generate_fraudulent_transactions(self, n_transactions=400):
         """Generate fraudulent transactions with suspicious patterns"""
-        transactions = []
+        n = n_transactions
+        pattern = self.rng.integers(0, len(_FRAUD_TYPES), size=n)
+        high_risk = pattern == _HIGH_RISK
+        burst = pattern == _BURST
         
-        for i in range(n_transactions):
-            fraud_type = np.random.choice(['high_amount', 'late_night', 'high_risk', 'burst'])
-            
-            if fraud_type == 'high_amount':
-                # Extremely high amounts
-                amount = np.random.lognormal(mean=8, sigma=1.5)
-                amount = np.clip(amount, 10000, 100000)
-                transaction_type = np.random.choice(['transfer', 'purchase'])
-                transaction_hour = np.random.choice(range(9, 21))  # Daytime to avoid suspicion
-                
-            elif fraud_type == 'late_night':
-                # Late night activity
-                amount = np.random.lognormal(mean=4, sigma=1.5)
-                amount = np.clip(amount, 100, 10000)
-                transaction_type = np.random.choice(['transfer', 'withdrawal'])
-                transaction_hour = np.random.choice([0, 1, 2, 3, 4, 5, 22, 23])
-                
-            elif fraud_type == 'high_risk':
-                # High risk scores
-                amount = np.random.lognormal(mean=5, sigma=1.5)
-                amount = np.clip(amount, 500, 20000)
-                transaction_type = np.random.choice(['transfer', 'purchase'])
-                transaction_hour = np.random.choice(24)
-                location_risk_score = np.random.uniform(0.7, 1.0)
-                device_risk_score = np.random.uniform(0.7, 1.0)
-                
-            else:  # burst
-                # Burst activity pattern
-                amount = np.random.lognormal(mean=3.5, sigma=1.0)
-                amount = np.clip(amount, 50, 5000)
-                transaction_type = np.random.choice(['purchase', 'payment'])
-                transaction_hour = np.random.choice(24)
-                past_transactions_24h = np.random.randint(20, 50)
-            
-            # Generate base values
-            if fraud_type != 'high_risk':
-                location_risk_score = np.random.beta(a=1, b=3)
-                device_risk_score = np.random.beta(a=1, b=2)
-            
-            if fraud_type != 'burst':
-                past_transactions_24h = np.random.poisson(lam=8)
-            
-            account_age_days = np.random.gamma(shape=1, scale=180)  # Often newer accounts
-            
-            transaction = {
-                'transaction_id': f'FRD_{i+1:06d}',
-                'amount': round(amount, 2),
-                'transaction_type': transaction_type,
-                'account_age_days': int(account_age_days),
-                'location_risk_score': round(location_risk_score, 3),
-                'device_risk_score': round(device_risk_score, 3),
-                'transaction_hour': transaction_hour,
-                'past_transactions_24h': past_transactions_24h,
-                'is_anomaly': 1
-            }
-            transactions.append(transaction)
-            
-        return transactions
+        # Pattern-specific amount, type and hour, looked up per row
+        amounts = np.exp(_FRAUD_AMOUNT_MEAN[pattern] +
+                         _FRAUD_AMOUNT_SIGMA[pattern] * self.rng.standard_normal(n))
+        amounts = np.clip(amounts, _FRAUD_AMOUNT_LOW[pattern], _FRAUD_AMOUNT_HIGH[pattern])
+        types = _FRAUD_TRANSACTION_TYPES[pattern, self.rng.integers(0, 2, size=n)]
+        hour_slot = (self.rng.random(n) * _FRAUD_HOUR_COUNTS[pattern]).astype(np.int64)
+        hours = _FRAUD_HOURS[pattern, hour_slot]
+        
+        # High risk scores for the high_risk pattern, base values otherwise
+        location_risk = np.where(high_risk, self.rng.uniform(0.7, 1.0, size=n),
+                                 self.rng.beta(a=1, b=3, size=n))
+        device_risk = np.where(high_risk, self.rng.uniform(0.7, 1.0, size=n),
+                               self.rng.beta(a=1, b=2, size=n))
+        
+        # Burst activity pattern
+        past = np.where(burst, self.rng.integers(20, 50, size=n),
+                        self.rng.poisson(lam=8, size=n))
+        
+        ages = self.rng.gamma(shape=1, scale=180, size=n).astype(np.int32)  # Often newer accounts
+        
+        # Round whole columns in place
+        np.round(amounts, 2, out=amounts)
+        np.round(location_risk, 3, out=location_risk)
+        np.round(device_risk, 3, out=device_risk)
+        
+        return {
+            'transaction_id': _transaction_ids('FRD_', n),
+            'amount': amounts,
+            'transaction_type': types,
+            'account_age_days': ages,
+            'location_risk_score': location_risk,
+            'device_risk_score': device_risk,
+            'transaction_hour': hours,
+            'past_transactions_24h': past,
+            'is_anomaly': np.ones(n, dtype=np.int64)
+        }
     
     def generate_dataset(self):
         """Generate complete dataset with normal and fraudulent transactions"""
@@ -125,27 +152,33 @@ class TransactionDataGenerator:
         print("Generating fraudulent transactions...")
         fraudulent_transactions = self.generate_fraudulent_transactions(400)
         
-        # Combine and shuffle
-        all_transactions = normal_transactions + fraudulent_transactions
-        np.random.shuffle(all_transactions)
-        
-        df = pd.DataFrame(all_transactions)
+        # Combine column-wise and shuffle
+        df = pd.DataFrame({
+            col: np.concatenate([normal_transactions[col], fraudulent_transactions[col]])
+            for col in normal_transactions
+        })
+        perm = self.rng.permutation(len(df))
+        df = df.iloc[perm].reset_index(drop=True)
         print(f"Dataset generated: {len(df)} total transactions")
-        print(f"Normal transactions: {len(df[df['is_anomaly'] == 0])}")
-        print(f"Fraudulent transactions: {len(df[df['is_anomaly'] == 1])}")
+        counts = df['is_anomaly'].value_counts()
+        print(f"Normal transactions: {counts.get(0, 0)}")
+        print(f"Fraudulent transactions: {counts.get(1, 0)}")
         
         return df
     
     def get_sample_transaction(self, is_fraudulent=None):
         """Get a random sample transaction"""
-        df = self.generate_dataset()
+        if self._cached_df is None:
+            df = self.generate_dataset()
+            self._normal_idx = np.flatnonzero(df['is_anomaly'].to_numpy() == 0)
+            self._fraud_idx = np.flatnonzero(df['is_anomaly'].to_numpy() == 1)
+            self._cached_df = df
         
         if is_fraudulent is True:
-            sample_df = df[df['is_anomaly'] == 1]
+            idx = self.rng.choice(self._fraud_idx)
         elif is_fraudulent is False:
-            sample_df = df[df['is_anomaly'] == 0]
+            idx = self.rng.choice(self._normal_idx)
         else:
-            sample_df = df
+            idx = self.rng.integers(0, len(self._cached_df))
             
-        sample = sample_df.iloc[np.random.randint(0, len(sample_df))]
-        return sample.to_dict()
+        return self._cached_df.iloc[idx].to_dict()
@@ -1,10 +1,13 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from typing import List
 import uvicorn
 import os
+import random
 import sys
 
 # Add current directory to path for imports
@@ -13,28 +16,13 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from data_generator import TransactionDataGenerator
 from model import FraudDetectionModel
 
-# Initialize FastAPI app
-app = FastAPI(
-    title="Fraud Detection API",
-    description="Real-time fraud detection system using Isolation Forest",
-    version="1.0.0"
-)
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Mount static files for frontend
-app.mount("/static", StaticFiles(directory="frontend"), name="static")
+# Path of the persisted model; reused across restarts to skip retraining
+MODEL_PATH = os.environ.get("MODEL_PATH", "model.joblib")
 
 # Initialize global variables
 model = None
 data_generator = None
+init_error = None
 
 def initialize_system():
     """Initialize model and data generator"""
@@ -50,22 +38,45 @@ def initialize_system():
     try:
         # Initialize data generator
         print("Initializing data generator...")
-        data_generator = TransactionDataGenerator(seed=42)
+        generator = TransactionDataGenerator(seed=42)
         
-        # Generate training dataset
-        print("Generating training dataset...")
-        df = data_generator.generate_dataset()
-        
-        # Initialize and train model
+        # Initialize fraud detection model
         print("Initializing fraud detection model...")
-        model = FraudDetectionModel()
+        fraud_model = FraudDetectionModel()
+        
+        loaded = False
+        if os.path.exists(MODEL_PATH):
+            # Reuse the model persisted by a previous run; any file that is
+            # stale, damaged or unreadable is replaced by retraining
+            try:
+                fraud_model.load_model(MODEL_PATH)
+                loaded = True
+            except Exception as e:
+                print(f"⚠️ Ignoring saved model: {type(e).__name__}: {str(e)}")
+                fraud_model = FraudDetectionModel()
         
-        print("Training model on generated dataset...")
-        model.train(df)
+        if not loaded:
+            # Generate training dataset
+            print("Generating training dataset...")
+            df = generator.generate_dataset()
+            
+            print("Training model on generated dataset...")
+            fraud_model.train(df)
+            
+            try:
+                fraud_model.save_model(MODEL_PATH)
+            except OSError as e:
+                print(f"⚠️ Could not save model to {MODEL_PATH}: {str(e)}")
+        
+        data_generator = generator
+        model = fraud_model
         
         print("=" * 50)
         print("✅ Fraud Detection System is ready!")
-        print("✅ Model trained and loaded in memory")
+        if loaded:
+            print(f"✅ Model loaded from {MODEL_PATH}")
+        else:
+            print("✅ Model trained and loaded in memory")
         print("✅ API endpoints available")
         print("=" * 50)
         
@@ -73,6 +84,55 @@ def initialize_system():
         print(f"❌ Error during initialization: {str(e)}")
         raise
 
+def ensure_initialized():
+    """Initialize the system if needed, recording any error for later requests"""
+    global init_error
+    
+    if model is not None and data_generator is not None:
+        return
+    
+    # A failed attempt is retried on the next request
+    try:
+        initialize_system()
+        init_error = None
+    except Exception as e:
+        init_error = f"{type(e).__name__}: {str(e)}"
+
+@asynccontextmanager
+async def lifespan(app):
+    """Initialize the system once when the server boots"""
+    ensure_initialized()
+    yield
+
+def require_system():
+    """Ensure the system finished initializing before serving a request"""
+    # Hosts that skip the lifespan events initialize on the first request
+    ensure_initialized()
+    
+    if model is None or data_generator is None:
+        raise HTTPException(status_code=503, detail=f"System initialization failed: {init_error}")
+
+# Initialize FastAPI app
+app = FastAPI(
+    title="Fraud Detection API",
+    description="Real-time fraud detection system using Isolation Forest",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
+
+# Add CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Mount static files for frontend
+app.mount("/static", StaticFiles(directory="frontend"), name="static")
+
 # Pydantic models for API
 class TransactionRequest(BaseModel):
     amount: float
@@ -83,6 +143,9 @@ class TransactionRequest(BaseModel):
     transaction_hour: int
     past_transactions_24h: int
 
+class BatchRequest(BaseModel):
+    transactions: List[TransactionRequest]
+
 class PredictionResponse(BaseModel):
     prediction: str
     anomaly_score: float
@@ -97,13 +160,13 @@ class HealthResponse(BaseModel):
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
-    try:
-        initialize_system()
-    except Exception as e:
+    ensure_initialized()
+    
+    if init_error is not None:
         return HealthResponse(
             status="unhealthy",
             model_trained=False,
-            message=f"Initialization error: {str(e)}"
+            message=f"Initialization error: {init_error}"
         )
     
     if model is None or not model.is_trained:
@@ -122,15 +185,11 @@ async def health_check():
 @app.get("/sample-transaction")
 async def get_sample_transaction():
     """Get a random sample transaction for testing"""
-    try:
-        initialize_system()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"System initialization failed: {str(e)}")
+    require_system()
     
     try:
         # Randomly decide if we want a normal or fraudulent transaction
-        import random
-        is_fraudulent = random.choice([None, None, None, True, False])  # Bias towards normal
+        is_fraudulent = random.choices((None, True, False), weights=(3, 1, 1), k=1)[0]  # Bias towards normal
         
         sample = data_generator.get_sample_transaction(is_fraudulent=is_fraudulent)
         
@@ -145,10 +204,7 @@ async def get_sample_transaction():
 @app.post("/predict", response_model=PredictionResponse)
 async def predict_fraud(transaction: TransactionRequest):
     """Predict if a transaction is fraudulent"""
-    try:
-        initialize_system()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"System initialization failed: {str(e)}")
+    require_system()
     
     try:
         # Convert Pydantic model to dict
@@ -162,6 +218,19 @@ async def predict_fraud(transaction: TransactionRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error making prediction: {str(e)}")
 
+@app.post("/predict-batch", response_model=List[PredictionResponse])
+async def predict_fraud_batch(batch: BatchRequest):
+    """Predict fraud for a batch of transactions in a single model call"""
+    require_system()
+    
+    try:
+        transactions = [transaction.dict() for transaction in batch.transactions]
+        
+        return model.predict_batch(transactions)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error making predictions: {str(e)}")
+
 @app.get("/")
 async def root():
     """Root endpoint - serve frontend"""
@@ -174,7 +243,8 @@ async def root():
         "endpoints": {
             "health": "/health",
             "sample_transaction": "/sample-transaction",
-            "predict": "/predict (POST)"
+            "predict": "/predict (POST)",
+            "predict_batch": "/predict-batch (POST)"
         },
         "model": "Isolation Forest",
         "status": "operational" if model and model.is_trained else "initializing"